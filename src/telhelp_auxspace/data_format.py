@@ -6,8 +6,13 @@
 #  by Maximilian Stephan for Auxspace eV.
 #
 
+import numpy as np
+
+from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Iterable, Optional
+from operator import itemgetter
+from sys import intern
+from typing import Any, Callable, Iterable, Optional
 
 
 class DataFormat(Enum):
@@ -17,7 +22,20 @@ class DataFormat(Enum):
     csv = "csv"
     multi_csv = "multi-csv"
     influxdb_lines = "influxdb-lines"
-    
+
+    @staticmethod
+    def _parse_lines(_lines: list[str]) -> list[tuple[str, dict[str, Any], int]]:
+        """Parse all InfluxDB Lines once, for all conversions to build upon.
+
+        Args:
+            _lines (list[str]): Data as InfluxDB Lines
+
+        Returns:
+            list[tuple[str, dict[str, Any], int]]: measurement, fields dictionary
+                and timestamp of every line.
+        """
+        return [parse_influxdb_line(line) for line in _lines]
+
     @staticmethod
     def _convert_json(_lines: list[str]) -> dict[str, dict[str, list[dict[str, Any]]]]:
         """Convert the data structure from InfluxDB Lines into JSON syntax.
@@ -65,8 +83,7 @@ class DataFormat(Enum):
                 }
         """
         output: dict[str, dict[str, list[dict[str, Any]]]] = {}
-        for line in _lines:
-            measurement, fields, timestamp = parse_influxdb_line(line)
+        for measurement, fields, timestamp in DataFormat._parse_lines(_lines):
             if not output.get(measurement):
                 output[measurement] = {}
             for key, value in fields.items():
@@ -108,16 +125,14 @@ class DataFormat(Enum):
                     },
                 ]
         """
-        output: list[dict[str, Any]] = []
-        for line in _lines:
-            measurement, fields, timestamp = parse_influxdb_line(line)
-            json_line = {
+        return [
+            {
                 "measurement": measurement,
                 "fields": fields,
                 "timestamp": timestamp,
             }
-            output.append(json_line)
-        return output
+            for measurement, fields, timestamp in DataFormat._parse_lines(_lines)
+        ]
 
     @staticmethod
     def _convert_csv(_lines: list[str]) -> list[str]:
@@ -135,36 +150,32 @@ class DataFormat(Enum):
                 ]
         """
         output: list[str] = []
-        jsonline_data: list[dict[str, Any]] = DataFormat._convert_jsonlines(_lines)
-        csv_dict_lines: list[dict[str, Any]] = []
-        csv_header_names: list[str] = []
+        csv_data_lines: list[tuple[int, dict[int, Any]]] = []
+        # Column index of each header name, in order of appearance
+        csv_header_index: dict[str, int] = {}
 
         # First find out about header names and their data
-        for line in jsonline_data:
-            fields: dict[str, Any] = line["fields"]
-            data_line: dict[str, Any] = {
-                "timestamp": line["timestamp"],
-            }
+        for measurement, fields, timestamp in DataFormat._parse_lines(_lines):
+            data_line: dict[int, Any] = {}
             for field, value in fields.items():
-                csv_header_name = f'{line["measurement"]}_{field}'
-                if csv_header_name not in csv_header_names:
-                    csv_header_names.append(csv_header_name)
-                data_line[csv_header_name] = value
-            csv_dict_lines.append(data_line)
+                csv_header_name = f'{measurement}_{field}'
+                index = csv_header_index.setdefault(csv_header_name, len(csv_header_index))
+                data_line[index] = value
+            csv_data_lines.append((timestamp, data_line))
 
         # Then add the header
-        csv_header: str = f'{",".join(csv_header_names)},timestamp'
+        csv_header: str = f'{",".join(csv_header_index)},timestamp'
         output.append(csv_header)
 
         # At last, fill in the data in the right format (sorted by timestamp)
-        for line in sorted(csv_dict_lines, key=lambda l: l["timestamp"]):
-            local_keys: list[str] = line.keys()
-            # Fill in the missing metrics with ""
-            for name in csv_header_names:
-                if name not in local_keys:
-                    line[name] = ""
-            data: str = ",".join([ str(line[name]) for name in csv_header_names ])
-            output.append(f'{data},{line["timestamp"]}')
+        num_columns: int = len(csv_header_index)
+        csv_data_lines.sort(key=itemgetter(0))
+        for timestamp, data_line in csv_data_lines:
+            # Missing metrics stay "", the timestamp is the last column
+            row: list[str] = [""] * num_columns + [str(timestamp)]
+            for index, value in data_line.items():
+                row[index] = str(value)
+            output.append(",".join(row))
         return output
 
     @staticmethod
@@ -187,7 +198,7 @@ class DataFormat(Enum):
                 ]
         """
         output: list[str] = []
-        csv_multi: dict[str, Any] = __influxdb_line2csv_like_json(_lines)
+        csv_multi: dict[str, Any] = _influxdb_line2csv_like_json(_lines)
         for _, value in csv_multi.items():
             output.extend(value)
             output.append("")  # One empty line to show that another table is following
@@ -206,27 +217,27 @@ class DataFormat(Enum):
             Iterable: The data in the desired iterable output format.
                 E.g. JSON returns dict[str, Any], whereas csv returns list[str].
         """
-        output: Iterable = ""
-        match(self):
-            case DataFormat.influxdb_lines:
-                output = _lines
-            case DataFormat.json:
-                output = DataFormat._convert_json(_lines)
-            case DataFormat.json_lines:
-                output = DataFormat._convert_jsonlines(_lines)
-            case DataFormat.csv:
-                output = DataFormat._convert_csv(_lines)
-            case DataFormat.multi_csv:
-                output = DataFormat._convert_csv_multiline(_lines)
-            case _:
-                print(f"DataFormat {self} is not known.")
-        return output
+        converter: Optional[Callable[[list[str]], Iterable]] = _CONVERTERS.get(self)
+        if converter is None:
+            print(f"DataFormat {self} is not known.")
+            return ""
+        return converter(_lines)
 
     def __str__(self):
         return self.value
 
 
-def __influxdb_line2csv_like_json(_lines: list[str]) -> dict[str, list[str]]:
+# Conversion function of each data format, looked up by DataFormat.convert_lines
+_CONVERTERS: dict[DataFormat, Callable[[list[str]], Iterable]] = {
+    DataFormat.influxdb_lines: lambda _lines: _lines,
+    DataFormat.json: DataFormat._convert_json,
+    DataFormat.json_lines: DataFormat._convert_jsonlines,
+    DataFormat.csv: DataFormat._convert_csv,
+    DataFormat.multi_csv: DataFormat._convert_csv_multiline,
+}
+
+
+def _influxdb_line2csv_like_json(_lines: list[str]) -> dict[str, list[str]]:
     """
     Convert InfluxDB line protocol formatted list of strings
     into a dictionary with CSV-formatted content.
@@ -255,26 +266,29 @@ def __influxdb_line2csv_like_json(_lines: list[str]) -> dict[str, list[str]]:
                 }
     """
     output: dict[str, list[str]] = {}
-    jsonized_output: dict[str, Any] = DataFormat._convert_json(_lines)
-    for measurement, metrics in jsonized_output.items():
+    frames: dict[str, MeasurementFrame] = group_measurement_frames(DataFormat._parse_lines(_lines))
+
+    for measurement, frame in frames.items():
         # Sort keys, so that HEADER and the corresponding values are correctly aligned
-        metric_keys: list[str] = sorted(metrics.keys())
-        csv_header: str = ",".join(sorted(metric_keys)) + ",timestamp"
+        metric_keys: list[str] = sorted(frame.fields)
+        csv_header: str = ",".join(metric_keys) + ",timestamp"
         output[measurement] = [csv_header]
 
         # Sort by timestamp ascending
-        sorted_data_fields: dict[str, list[dict[str, Any]]] = {
-            key: sorted(value, key=lambda fields: fields["timestamp"])
-            for key, value in metrics.items()
-        }
-
-        # Little "cheat" since all keys in metric dict have the same amount of values
-        for i, _ in enumerate(sorted_data_fields[metric_keys[0]]):
-            csv_line: str = ""
-            for metric in metric_keys:
-                csv_line += f"{sorted_data_fields[metric][i]["value"]},"
-            csv_line += f"{sorted_data_fields[metric_keys[0]][i]["timestamp"]}"
-            output[measurement].append(csv_line)
+        order: np.ndarray = np.argsort(frame.timestamps, kind="stable")
+
+        # Format column by column, metrics missing in a line stay ""
+        columns: list[list[str]] = [
+            [
+                str(value) if present else ""
+                for value, present in zip(
+                    frame.fields[metric][order].tolist(), frame.present[metric][order].tolist(),
+                )
+            ]
+            for metric in metric_keys
+        ]
+        columns.append(list(map(str, frame.timestamps[order].tolist())))
+        output[measurement].extend(map(",".join, zip(*columns)))
 
     return output
 
@@ -290,17 +304,75 @@ def parse_influxdb_line(line) -> tuple[Optional[str], Optional[dict[str, Any]],
     try:
         # Split the line into its components: measurement, fields, and timestamp
         measurement, fields, timestamp_str = line.split()
+        # Measurement and field names repeat on every line, so share one string object each
+        measurement = intern(measurement)
 
         # Parse fields into a dictionary
         field_dict: dict[str, Any] = {}
         for field in fields.split(','):
             key, value = field.split('=')
-            field_dict[key] = float(value)
+            field_dict[intern(key)] = float(value)
 
         # Convert timestamp from str to int
         timestamp: int = int(timestamp_str)
 
-        return measurement, field_dict, timestamp
-
     except Exception as e:
         raise ValueError(f"Error parsing line: {line}") from e
+
+    return measurement, field_dict, timestamp
+
+
+@dataclass
+class MeasurementFrame:
+    """All values of a single measurement, stored as arrays per field."""
+    measurement: str
+    # Timestamps of all lines of the measurement
+    timestamps: np.ndarray
+    # Values of each field, NaN where a line does not have that field
+    fields: dict[str, np.ndarray]
+    # Whether a line has the field, to tell missing fields from NaN values
+    present: dict[str, np.ndarray]
+
+
+def group_measurement_frames(
+    parsed_lines: list[tuple[str, dict[str, Any], int]],
+) -> dict[str, MeasurementFrame]:
+    """
+    Group parsed InfluxDB lines by their measurement name into MeasurementFrames.
+
+    Args:
+        parsed_lines (list[tuple[str, dict[str, Any], int]]): List of parsed InfluxDB lines
+            as (measurement, fields, timestamp) tuples.
+
+    Returns:
+        dict[str, MeasurementFrame]: a dictionary where each key is a measurement name,
+            and each value holds the timestamps and field values of that measurement.
+    """
+    grouped_lines: dict[str, list[tuple[str, dict[str, Any], int]]] = {}
+
+    for parsed_line in parsed_lines:
+        if parsed_line[0]:
+            grouped_lines.setdefault(parsed_line[0], []).append(parsed_line)
+
+    frames: dict[str, MeasurementFrame] = {}
+    for measurement, lines in grouped_lines.items():
+        num_lines: int = len(lines)
+        # Values and presence of each field, in order of appearance.
+        # Both are filled in a single pass over all lines of the measurement.
+        values: dict[str, list[float]] = {}
+        present: dict[str, list[bool]] = {}
+        for index, (_, fields, _) in enumerate(lines):
+            for name, value in fields.items():
+                if name not in values:
+                    values[name] = [np.nan] * num_lines
+                    present[name] = [False] * num_lines
+                values[name][index] = value
+                present[name][index] = True
+
+        frames[measurement] = MeasurementFrame(
+            measurement=measurement,
+            timestamps=np.array([line[2] for line in lines], dtype=np.int64),
+            fields={name: np.array(column, dtype=np.float64) for name, column in values.items()},
+            present={name: np.array(column, dtype=np.bool_) for name, column in present.items()},
+        )
+    return frames
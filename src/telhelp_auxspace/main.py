@@ -30,7 +30,7 @@ from typing import Union
 from telhelp_auxspace.parser import get_argv
 from telhelp_auxspace.plot import plot_data
 from telhelp_auxspace.tsupdater import (
-    update_timeseries, get_earliest_and_latest_stamp
+    update_timeseries, get_earliest_and_latest_stamp, read_timeseries,
 )
 from . import (
     STDOUT_OUTPUT_NOT_SET_SYMBOL, STDOUT_OUTPUT_SYMBOL, PRINT_SECONDS_THRESHHOLD,
@@ -50,6 +50,8 @@ def _telhelp(args: argparse.Namespace) -> int:
     input_file: Path = args.input_file
     output_files: list[Union[Path, str]] = []
     lines: list[str] = []
+    earliest_stamp: int = 0
+    latest_stamp: int = 0
 
     if args.show_only and args.no_show:
         print("--show-only and --no-show are conflicting options. Choose one.")
@@ -68,19 +70,20 @@ def _telhelp(args: argparse.Namespace) -> int:
 
     if args.show_only:
         # If "show-only", don't convert the lines, just read them from input_file
-        with open(input_file, mode="r", encoding="UTF-8") as datafile:
-            lines = [line for line in datafile.read().splitlines() if line]
+        lines = read_timeseries(input_file)
+        earliest_stamp, latest_stamp = get_earliest_and_latest_stamp(lines)
     else:
         # But if the option is not specified, update all timeseries data
-        lines = update_timeseries(
+        lines, earliest_stamp, latest_stamp = update_timeseries(
             input_file, output_files, args.timebase, args.in_place, args.data_format,
         )
     if not args.no_show:
         # Plot the data if desired
-        earliest_stamp, latest_stamp = get_earliest_and_latest_stamp(lines)
-        # Add seconds to graph, if the time difference is very small (< 10 mins)
+        # Add seconds to graph, if the time difference is very small (< 10 mins).
+        # Timestamps are in ms, the threshold is in seconds.
         date_format = (
-            '%H:%M:%S' if latest_stamp - earliest_stamp <= PRINT_SECONDS_THRESHHOLD else '%H:%M'
+            '%H:%M:%S' if latest_stamp - earliest_stamp <= PRINT_SECONDS_THRESHHOLD * 1_000
+            else '%H:%M'
         )
         plot_data(lines, date_format)
     return 0
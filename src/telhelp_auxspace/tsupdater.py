@@ -7,52 +7,133 @@
 #
 
 import json
+import math
+import sys
 import time
 
+import numpy as np
+
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import Any, Iterable, Optional, Union
+from typing import Any, Callable, Iterable, Iterator, Optional, Union
 
 from telhelp_auxspace.data_format import DataFormat
 from . import STDOUT_OUTPUT_NOT_SET_SYMBOL, STDOUT_OUTPUT_SYMBOL
 
+# Amount of lines to join into a single chunk of output
+_LINES_PER_CHUNK: int = 10_000
+# Buffer size of output files in bytes
+_WRITE_BUFFER_SIZE: int = 1 << 20
+
+# orjson is optional, but encodes a lot faster than the json module
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def _update_ts(single_line: str, timebase: int) -> str:
+
+def _split_line_ts(line: str) -> tuple[str, str, str]:
     """
-    Update a single line in the InfluxDB Line protocol with an absolute timestamp.
+    Split a single line in the InfluxDB Line protocol into its timestamp and the rest,
+    separated by any whitespace.
 
     Args:
-      - single_line (str): Input line with relative timestamp
-      - timebase (int): timestamp in ms the original timestamp should be relative to.
+      - line (str): Input line with timestamp
 
     Returns:
-      str: updated InfluxDB Line protocol string
+      tuple[str, str, str]: the line without its timestamp, the separator
+        and the timestamp, like str.rpartition.
     """
-    timestamp_str: str = ""
-    timestamp: int = 0
-    elements: list[str] = single_line.split()
+    elements: list[str] = line.split()
 
     # First, see if there is at least three elements (measurement, fields, timestamp)
     if len(elements) < 3:
-        raise ValueError(f"Cannot update timestamp for line {single_line}. No timestamp found.")
+        raise ValueError(f"Cannot update timestamp for line {line}. No timestamp found.")
+
+    # All elements but the timestamp, seperated by spaces
+    return " ".join(elements[:-1]), " ", elements[-1]
+
+
+def _split_ts(timeseries: list[str]) -> tuple[tuple[str, ...], np.ndarray]:
+    """
+    Split all lines in the InfluxDB Line protocol into their timestamps and the rest.
+
+    Args:
+      - timeseries (list[str]): Input lines with timestamps
+
+    Returns:
+      tuple[tuple[str, ...], np.ndarray]: the lines without their timestamps
+        and the timestamps as an int64 array.
+    """
+    if not timeseries:
+        return (), np.empty(0, dtype=np.int64)
+
+    # Split every line into everything before the timestamp and the timestamp itself.
+    # Trailing whitespace would otherwise be taken for an empty timestamp.
+    split_lines: list[tuple[str, str, str]] = [
+        line.rstrip().rpartition(' ') for line in timeseries
+    ]
+    # Without a space before the timestamp, a line is either missing its measurement
+    # or fields, or it is separated by other whitespace like tabs.
+    for index, (prefix, _, _) in enumerate(split_lines):
+        if ' ' not in prefix:
+            split_lines[index] = _split_line_ts(timeseries[index])
+    prefixes, _, timestamp_strs = zip(*split_lines)
 
-    # Remove the last element, since that is the timestamp
-    timestamp_str = elements.pop()
     try:
-        # Try converting the timestamp to an integer.
-        timestamp = int(timestamp_str)
+        # Convert all timestamps at once into an integer array.
+        timestamps: np.ndarray = np.fromiter(
+            timestamp_strs, dtype=np.int64, count=len(timestamp_strs),
+        )
     except ValueError as e:
-        raise ValueError(f"Cannot convert timestamp from line {single_line}") from e
+        # Find the offending line to give a helpful error message
+        for line, timestamp_str in zip(timeseries, timestamp_strs):
+            try:
+                int(timestamp_str)
+            except ValueError:
+                raise ValueError(f"Cannot convert timestamp from line {line}") from e
+        raise
+
+    return prefixes, timestamps
+
+
+def _update_ts(prefixes: tuple[str, ...], timestamps: np.ndarray, timebase: int) -> list[str]:
+    """
+    Update all split lines in the InfluxDB Line protocol with absolute timestamps.
+
+    Args:
+      - prefixes (tuple[str, ...]): Input lines without their relative timestamps
+      - timestamps (np.ndarray): Relative timestamps of the input lines.
+          The array is updated in place.
+      - timebase (int): timestamp in ms the original timestamps should be relative to.
 
-    # Add the "relative" timestamp to the given "absolute" timebase
-    timestamp += timebase
-    timestamp = int(timestamp)
+    Returns:
+      list[str]: updated InfluxDB Line protocol strings
+    """
+    # Add the "relative" timestamps to the given "absolute" timebase
+    # in place, so no second array of the same size has to be allocated
+    timestamps += timebase
 
-    # Since we popped off the old timestamp, append the new one instead
-    elements.append(str(timestamp))
+    # Append the new timestamps to the rest of their lines
+    return [
+        f"{prefix} {timestamp}" for prefix, timestamp in zip(prefixes, timestamps.tolist())
+    ]
 
-    # Return all elements as a single InfluxDB Line string, seperated by spaces
-    return " ".join(elements)
+
+def read_timeseries(input_file: Path) -> list[str]:
+    """
+    Read all non-empty InfluxDB lines from a file.
+
+    Args:
+        input_file (Path): File containing the telemetry data as InfluxDB Lines.
+
+    Returns:
+        list[str]: InfluxDB Lines without surrounding whitespace.
+    """
+    # Stream the file line by line instead of reading it into one big string first
+    with open(input_file, mode="r", encoding="UTF-8") as datafile:
+        return [line for line in (raw_line.strip() for raw_line in datafile) if line]
 
 
 def get_earliest_and_latest_stamp(timeseries: list[str]) -> tuple[int, int]:
@@ -65,38 +146,169 @@ def get_earliest_and_latest_stamp(timeseries: list[str]) -> tuple[int, int]:
     Returns:
         tuple[int, int]: Earliest and latest timestamp from list.
     """
-    ts_strings: list[str] = [ts.split()[-1] for ts in timeseries]
-    ts_ints: list[int] = [ 0 for _ in ts_strings ]
+    timestamps: np.ndarray = np.zeros(len(timeseries), dtype=np.int64)
     try:
-        ts_ints = [int(ts) for ts in ts_strings]
+        _, timestamps = _split_ts(timeseries)
     except ValueError as err:
         print(f"Could not determine max timestamp: {err}")
-    return min(ts_ints), max(ts_ints)
+    return int(timestamps.min()), int(timestamps.max())
+
+
+def _join_lines(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Yield the given lines with newlines in between, joined in chunks of lines.
+
+    Args:
+        lines (Iterable[str]): Lines to join.
+
+    Returns:
+        Iterator[str]: Chunks of joined lines and newline separators.
+    """
+    # Joining chunks of lines is faster than writing every line on its own,
+    # but does not need a copy of the whole output in memory.
+    line_iter: Iterator[str] = iter(lines)
+    first: bool = True
+    while chunk := list(islice(line_iter, _LINES_PER_CHUNK)):
+        if not first:
+            yield "\n"
+        yield "\n".join(chunk)
+        first = False
+
+
+def _all_finite(values: Iterable[float]) -> bool:
+    """
+    Check whether all values are finite, so neither NaN nor (-)Infinity.
+
+    Args:
+        values (Iterable[float]): Values to check.
+
+    Returns:
+        bool: True if all values are finite.
+    """
+    return all(map(math.isfinite, values))
 
 
-def timeseries2str(timeseries: Any, data_format: DataFormat) -> str:
+def _dumps_compact(data: Any, finite: bool = False) -> str:
+    """
+    Encode data as compact JSON, using orjson if it is installed
+    and the data has no non-finite values.
+
+    Args:
+        data (Any): Data to encode.
+        finite (bool): Whether the caller checked that data has no NaN or Infinity values.
+            orjson writes those as null, so it is only used if this is set.
+            Defaults to False.
+
+    Returns:
+        str: JSON without indentation and whitespace.
+    """
+    if orjson is not None and finite:
+        return orjson.dumps(data).decode()
+    return json.dumps(data, separators=(",", ":"))
+
+
+def _json_chunks(timeseries: Any, pretty: bool) -> Iterator[str]:
+    """
+    Yield timeseries data as a single JSON document.
+
+    Args:
+        timeseries (Any): Timeseries data
+        pretty (bool): Indent JSON and put spaces after separators for human readers.
+
+    Returns:
+        Iterator[str]: JSON formatted chunks.
+    """
+    if pretty:
+        yield json.dumps(timeseries, indent=4)
+    else:
+        # Compact JSON is faster to encode and a lot smaller
+        yield _dumps_compact(timeseries, _all_finite(
+            point["value"]
+            for field_points in timeseries.values()
+            for points in field_points.values()
+            for point in points
+        ))
+
+
+def _jsonlines_chunks(timeseries: Any, pretty: bool) -> Iterator[str]:
+    """
+    Yield timeseries data as JSON Lines.
+
+    Args:
+        timeseries (Any): Timeseries data
+        pretty (bool): Put spaces after separators for human readers.
+
+    Returns:
+        Iterator[str]: JSON Lines formatted chunks.
+    """
+    if pretty:
+        yield from _join_lines(json.dumps(line) for line in timeseries)
+    else:
+        yield from _join_lines(
+            _dumps_compact(line, _all_finite(line["fields"].values())) for line in timeseries
+        )
+
+
+def _lines_chunks(timeseries: Any, pretty: bool) -> Iterator[str]:
+    """
+    Yield timeseries data that already consists of lines.
+
+    Args:
+        timeseries (Any): Timeseries data
+        pretty (bool): Unused, lines are written as they are.
+
+    Returns:
+        Iterator[str]: Chunks of joined lines and newline separators.
+    """
+    yield from _join_lines(timeseries)
+
+
+# Output formatter of each data format, looked up by timeseries2iter
+_FORMATTERS: dict[DataFormat, Callable[[Any, bool], Iterator[str]]] = {
+    DataFormat.json: _json_chunks,
+    DataFormat.json_lines: _jsonlines_chunks,
+    DataFormat.csv: _lines_chunks,
+    DataFormat.multi_csv: _lines_chunks,
+    DataFormat.influxdb_lines: _lines_chunks,
+}
+
+
+def timeseries2iter(timeseries: Any, data_format: DataFormat, pretty: bool = False) -> Iterator[str]:
+    """
+    Create file writeable chunks from timeseries data.
+
+    Args:
+        timeseries (Any): Timeseries data
+        data_format (DataFormat): Format of the timeseries source data.
+        pretty (bool): Indent JSON and put spaces after separators for human readers.
+            Defaults to False (compact output).
+
+    Returns:
+        Iterator[str]: formatted chunks to write into a file or STDOUT.
+    """
+    formatter: Optional[Callable[[Any, bool], Iterator[str]]] = _FORMATTERS.get(data_format)
+    if formatter is None:
+        print(f"No such DataFormat: {data_format}")
+        formatter = _json_chunks
+    return formatter(timeseries, pretty)
+
+
+def timeseries2str(timeseries: Any, data_format: DataFormat, pretty: bool = True) -> str:
     """
     Create a file writeable string from timeseries data.
-    
+
+    Kept for API compatibility, use timeseries2iter to avoid building the whole string.
+
     Args:
         timeseries (Any): Timeseries data
         data_format (DataFormat): Format of the timeseries source data.
+        pretty (bool): Indent JSON and put spaces after separators for human readers.
+            Defaults to True (pretty output), like before timeseries2iter existed.
 
     Returns:
         str: single formatted String to write into a file or STDOUT.
     """
-    output: str = ""
-    match (data_format):
-        case DataFormat.json:
-            output = json.dumps(timeseries, indent=4)
-        case DataFormat.json_lines:
-            output = "\n".join([json.dumps(line) for line in timeseries])
-        case DataFormat.csv | DataFormat.multi_csv | DataFormat.influxdb_lines:
-            output = "\n".join(timeseries)
-        case _:
-            print(f"No such DataFormat: {data_format}")
-            output = json.dumps(timeseries, indent=4)
-    return output
+    return "".join(timeseries2iter(timeseries, data_format, pretty))
 
 
 def influxdb_lines_convert(
@@ -123,7 +335,7 @@ def update_timeseries(
     timebase: Optional[int] = None,
     in_place: bool = False,
     data_format: DataFormat = DataFormat.influxdb_lines,
-) -> list[str]:
+) -> tuple[list[str], int, int]:
     """
     Update the timeseries Data from input_file using timebase and put the output into output_files.
 
@@ -138,35 +350,38 @@ def update_timeseries(
             Defaults to DataFormat.influxdb-lines
 
     Returns:
-        list[str]: Converted InfluxDB Lines.
+        tuple[list[str], int, int]: Converted InfluxDB Lines
+            and their earliest and latest absolute timestamp.
     """
     orig_timeseries: list[str] = []
+    prefixes: tuple[str, ...] = ()
+    timestamps: np.ndarray = np.empty(0, dtype=np.int64)
     updated_timeseries_lines: list[str] = []
     _updated_timeseries_formatted: Iterable = []
-    ts_out_str: str = ""
     earliest_stamp: int = 0
     latest_stamp: int = 0
 
     # Read input file into orig_timeseries as list of strings
-    with open(input_file, mode="r", encoding="UTF-8") as datafile:
-        orig_timeseries = [line for line in datafile.read().splitlines() if line]
+    orig_timeseries = read_timeseries(input_file)
 
-    # Get newest and oldest timestamp
-    earliest_stamp, latest_stamp = get_earliest_and_latest_stamp(orig_timeseries)
+    # Split off the timestamps and get the newest and oldest one
+    prefixes, timestamps = _split_ts(orig_timeseries)
+    earliest_stamp, latest_stamp = int(timestamps.min()), int(timestamps.max())
 
     # Autogenerate timebase if none is given
     if not timebase:
-        timebase = (time.time_ns() // 1e6) - latest_stamp
+        timebase = (time.time_ns() // 1_000_000) - latest_stamp
 
     earliest_stamp_abs: int = earliest_stamp + timebase
     latest_stamp_abs: int = latest_stamp + timebase
 
-    # Update all timestamps and convert them to a single string
-    updated_timeseries_lines = [
-        _update_ts(ts, timebase) for ts in orig_timeseries
-    ]
-    _updated_timeseries_formatted = influxdb_lines_convert(updated_timeseries_lines, data_format)
-    ts_out_str = timeseries2str(_updated_timeseries_formatted, data_format)
+    # Update all timestamps and convert them to the desired format
+    updated_timeseries_lines = _update_ts(prefixes, timestamps, timebase)
+    if data_format is DataFormat.influxdb_lines:
+        # The lines already are in the desired format
+        _updated_timeseries_formatted = updated_timeseries_lines
+    else:
+        _updated_timeseries_formatted = influxdb_lines_convert(updated_timeseries_lines, data_format)
 
     # In-place means output = input
     if in_place:
@@ -175,18 +390,24 @@ def update_timeseries(
     for output_file in output_files:
         # Write output to file, if specified
         if isinstance(output_file, Path):
-            with open(output_file, mode="w", encoding="UTF-8") as outfile:
-                outfile.write(ts_out_str)
+            with open(
+                output_file, mode="w", encoding="UTF-8", buffering=_WRITE_BUFFER_SIZE,
+            ) as outfile:
+                outfile.writelines(timeseries2iter(_updated_timeseries_formatted, data_format))
         # else, write to stdout
         elif isinstance(output_file, str):
             if output_file == STDOUT_OUTPUT_SYMBOL or (
                 output_file == STDOUT_OUTPUT_NOT_SET_SYMBOL and not in_place
             ):
-                print(ts_out_str)
+                # Only pretty-print for humans, not for pipes
+                sys.stdout.writelines(timeseries2iter(
+                    _updated_timeseries_formatted, data_format, pretty=sys.stdout.isatty(),
+                ))
+                print()
         # Print state
         print(f"Processed {latest_stamp} ms ({latest_stamp / 1_000 / 60} min) worth of data.")
         print()
         print(f"Oldest stamp is {earliest_stamp_abs} ({datetime.fromtimestamp(earliest_stamp_abs / 1_000)})")
         print(f"Newest stamp is {latest_stamp_abs} ({datetime.fromtimestamp(latest_stamp_abs / 1_000)})")
 
-    return updated_timeseries_lines
+    return updated_timeseries_lines, earliest_stamp_abs, latest_stamp_abs